@@ -0,0 +1,494 @@
+import os
+import time
+import json
+import hashlib
+import argparse
+import websocket
+from collections import deque
+from datetime import datetime
+from ts_master import get_websocket_debugger_url, launch_teamspeak, get_os_info, INJECT_SCRIPT_PATHS
+
+AUDIT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dumps", "audit")
+CACHE_PATH = os.path.join(AUDIT_DIR, "cache.json")
+
+# Name of the binding that improved_accessibility.js calls after each route change
+AUDIT_BINDING = "__tsA11yAuditNotify"
+
+# Roles Chrome reports for elements that have no meaningful (explicit or implicit) role
+GENERIC_ROLES = {"", "generic", "none", "presentation", "GenericContainer"}
+
+# Structural hash of the DOM plus, on demand, how many elements every rule in
+# window.tsA11yRules applies to (the same way applyRules() does). Both are computed
+# in the same evaluation so the coverage always belongs to the returned fingerprint.
+# The hash covers the attributes that decide roles, names, focusability and visibility.
+# For text we only record whether an element owns non-whitespace text nodes (not the
+# text itself), so chat updates don't invalidate the cache but a button that fills in
+# its label does. Rules whose match() reads the text (e.g. "Hide Auto Resize Overlay")
+# get the full text of the elements they select mixed in, so their coverage stays exact.
+SNAPSHOT_JS = """
+(function (withCoverage) {
+    let h = 0x811c9dc5;
+    let count = 0;
+    const mix = (s) => {
+        for (let i = 0; i < s.length; i++) {
+            h ^= s.charCodeAt(i);
+            h = Math.imul(h, 0x01000193);
+        }
+    };
+    const attrs = ['role', 'aria-label', 'aria-labelledby', 'aria-hidden', 'tabindex',
+                   'title', 'alt', 'hidden', 'disabled', 'type', 'style', 'href', 'contenteditable'];
+    const rules = window.tsA11yRules;
+    mix(location.href);
+    if (Array.isArray(rules)) {
+        rules.forEach(rule => {
+            if (!/textContent|innerText/.test(String(rule.match))) return;
+            try {
+                document.querySelectorAll(rule.selector).forEach(el => mix(el.textContent));
+            } catch (e) {
+                // Invalid selectors are reported by the coverage below
+            }
+        });
+    }
+    const walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_ELEMENT);
+    let node = walker.currentNode;
+    while (node) {
+        mix(node.tagName);
+        mix(node.id);
+        mix(typeof node.className === 'string' ? node.className : '');
+        for (const attr of attrs) {
+            const val = node.getAttribute(attr);
+            mix(val === null ? '\\0' : val);
+        }
+        let hasText = false;
+        for (let child = node.firstChild; child; child = child.nextSibling) {
+            if (child.nodeType === 3 && child.nodeValue.trim()) {
+                hasText = true;
+                break;
+            }
+        }
+        mix((hasText ? 'T' : 'E') + node.childElementCount);
+        count++;
+        node = walker.nextNode();
+    }
+    const fingerprint = (h >>> 0).toString(16) + '-' + count;
+
+    if (!withCoverage || !Array.isArray(rules)) return { fingerprint: fingerprint, coverage: null };
+    const coverage = rules.map(rule => {
+        let matched = 0;
+        try {
+            document.querySelectorAll(rule.selector).forEach(el => {
+                if (rule.match(el)) matched++;
+            });
+        } catch (e) {
+            return { name: rule.name, selector: rule.selector, matched: 0, error: String(e) };
+        }
+        return { name: rule.name, selector: rule.selector, matched: matched };
+    });
+    return { fingerprint: fingerprint, coverage: coverage };
+})(%s)
+"""
+
+# Maximum number of audited screens kept in cache.json
+CACHE_LIMIT = 50
+
+
+class CdpSession:
+    """
+    Minimal Chrome DevTools Protocol client that can pipeline several commands
+    on the same WebSocket and collect the responses by id.
+    Only events listed in `keep_events` are queued for later processing,
+    everything else (DOM/Accessibility notifications...) is dropped.
+    """
+
+    def __init__(self, ws, keep_events=()):
+        self.ws = ws
+        self.next_id = 1
+        self.keep_events = set(keep_events)
+        self.events = deque()
+
+    def batch(self, calls):
+        """
+        Sends every (method, params) pair without waiting, then returns the
+        results in the same order. Errors are returned as {"error": ...}.
+        """
+        ids = []
+        for method, params in calls:
+            msg = {"id": self.next_id, "method": method, "params": params or {}}
+            ids.append(self.next_id)
+            self.next_id += 1
+            self.ws.send(json.dumps(msg))
+
+        pending = set(ids)
+        responses = {}
+        while pending:
+            data = json.loads(self.ws.recv())
+            if "id" in data and data["id"] in pending:
+                pending.discard(data["id"])
+                responses[data["id"]] = data.get("result", {"error": data.get("error")})
+            elif data.get("method") in self.keep_events:
+                self.events.append(data)
+        return [responses[i] for i in ids]
+
+    def call(self, method, params=None):
+        return self.batch([(method, params)])[0]
+
+    def evaluate(self, expression):
+        result = self.call("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+        if result.get("error") or "exceptionDetails" in result:
+            print(f"[!] Evaluation Error: {result.get('error') or result.get('exceptionDetails')}")
+            return None
+        return result.get("result", {}).get("value")
+
+    def next_event(self):
+        if self.events:
+            return self.events.popleft()
+        while True:
+            data = json.loads(self.ws.recv())
+            if data.get("method") in self.keep_events:
+                return data
+
+
+def get_rules_fingerprint():
+    """
+    Hash of the injected scripts, so edits to the rules invalidate cached audits.
+    """
+    digest = hashlib.sha1()
+    for path in INJECT_SCRIPT_PATHS:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def cache_key(dom_fp, rules_fp, selectors):
+    return f"{dom_fp}:{rules_fp}:{','.join(selectors) or 'full'}"
+
+
+def load_cache(rules_fp):
+    """
+    Loads cached audits, dropping the ones made with a different version of the rules.
+    """
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {key: report for key, report in cache.items() if key.split(":", 2)[1] == rules_fp}
+
+
+def save_cache(cache):
+    # Dicts keep insertion order: the oldest audits are the first to go
+    while len(cache) > CACHE_LIMIT:
+        del cache[next(iter(cache))]
+    os.makedirs(AUDIT_DIR, exist_ok=True)
+    with open(CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+
+def ax_value(node, key):
+    return (node.get(key) or {}).get("value", "")
+
+
+def ax_property(node, name):
+    for prop in node.get("properties", []):
+        if prop.get("name") == name:
+            return prop.get("value", {}).get("value")
+    return None
+
+
+def check_errors(method, results):
+    """
+    Prints the first CDP error found in `results`. Returns True if there was one.
+    """
+    for result in results:
+        if result.get("error"):
+            print(f"[!] {method} Error: {result['error']}")
+            return True
+    return False
+
+
+def fetch_full_tree(session):
+    result = session.call("Accessibility.getFullAXTree")
+    if check_errors("Accessibility.getFullAXTree", [result]):
+        return None
+    return result.get("nodes", [])
+
+
+def fetch_subtrees(session, selectors):
+    """
+    Fetches only the accessibility subtrees rooted at the elements matching
+    `selectors`, one batch of getChildAXNodes requests per tree level.
+    Returns None if any request failed.
+    """
+    document = session.call("DOM.getDocument", {"depth": 0})
+    if check_errors("DOM.getDocument", [document]):
+        return None
+    root_id = document.get("root", {}).get("nodeId")
+    if not root_id:
+        print(f"[!] Error retrieving document: {document}")
+        return None
+
+    matches = session.batch([
+        ("DOM.querySelectorAll", {"nodeId": root_id, "selector": selector})
+        for selector in selectors
+    ])
+    if check_errors("DOM.querySelectorAll", matches):
+        return None
+    dom_ids = []
+    for selector, result in zip(selectors, matches):
+        found = result.get("nodeIds", [])
+        if not found:
+            print(f"[!] Subtree selector matched nothing: {selector}")
+        dom_ids.extend(found)
+    if not dom_ids:
+        return []
+
+    roots = session.batch([
+        ("Accessibility.getPartialAXTree", {"nodeId": dom_id, "fetchRelatives": False})
+        for dom_id in dom_ids
+    ])
+    if check_errors("Accessibility.getPartialAXTree", roots):
+        return None
+
+    nodes = {}
+
+    def collect(results):
+        # Only nodes with children we haven't seen yet need a getChildAXNodes request
+        parents = []
+        for result in results:
+            for node in result.get("nodes", []):
+                if node["nodeId"] not in nodes:
+                    nodes[node["nodeId"]] = node
+                    parents.append(node)
+        return [
+            node["nodeId"] for node in parents
+            if any(child_id not in nodes for child_id in node.get("childIds", []))
+        ]
+
+    level = collect(roots)
+    while level:
+        children = session.batch([("Accessibility.getChildAXNodes", {"id": ax_id}) for ax_id in level])
+        if check_errors("Accessibility.getChildAXNodes", children):
+            return None
+        level = collect(children)
+    return list(nodes.values())
+
+
+def describe_nodes(session, backend_ids):
+    """
+    Returns a short CSS-like description (tag#id.class) for each backend DOM node id.
+    """
+    results = session.batch([
+        ("DOM.describeNode", {"backendNodeId": backend_id})
+        for backend_id in backend_ids
+    ])
+    descriptions = {}
+    for backend_id, result in zip(backend_ids, results):
+        node = result.get("node")
+        if not node:
+            descriptions[backend_id] = f"<backend node {backend_id}>"
+            continue
+        attrs = node.get("attributes", [])
+        attrs = dict(zip(attrs[::2], attrs[1::2]))
+        desc = node.get("localName") or node.get("nodeName", "?").lower()
+        if attrs.get("id"):
+            desc += "#" + attrs["id"]
+        for cls in attrs.get("class", "").split():
+            desc += "." + cls
+        descriptions[backend_id] = desc
+    return descriptions
+
+
+def take_snapshot(session, with_coverage):
+    """
+    Returns {"fingerprint": ..., "coverage": ...} for the current DOM, or None on error.
+    """
+    snapshot = session.evaluate(SNAPSHOT_JS % ("true" if with_coverage else "false"))
+    if not snapshot or not snapshot.get("fingerprint"):
+        return None
+    return snapshot
+
+
+def run_audit(session, selectors, coverage):
+    """
+    Builds the report from the accessibility tree. Returns None if the tree could not be fetched.
+    """
+    nodes = fetch_subtrees(session, selectors) if selectors else fetch_full_tree(session)
+    if nodes is None:
+        return None
+
+    unnamed_buttons = []
+    focusable_without_role = []
+    for node in nodes:
+        if node.get("ignored"):
+            continue
+        role = ax_value(node, "role")
+        if role == "button" and not ax_value(node, "name").strip():
+            unnamed_buttons.append(node)
+        elif ax_property(node, "focusable") and role in GENERIC_ROLES:
+            focusable_without_role.append(node)
+
+    flagged = [n["backendDOMNodeId"] for n in unnamed_buttons + focusable_without_role if "backendDOMNodeId" in n]
+    descriptions = describe_nodes(session, flagged) if flagged else {}
+
+    def report_entry(node):
+        return {
+            "role": ax_value(node, "role"),
+            "name": ax_value(node, "name"),
+            "element": descriptions.get(node.get("backendDOMNodeId"), "?")
+        }
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "scope": selectors or "full",
+        "nodes_audited": len(nodes),
+        "unnamed_buttons": [report_entry(n) for n in unnamed_buttons],
+        "focusable_without_role": [report_entry(n) for n in focusable_without_role],
+        "unmatched_rules": None if coverage is None else [
+            {k: v for k, v in rule.items() if k != "matched"}
+            for rule in coverage if rule["matched"] == 0
+        ],
+        "rules_total": None if coverage is None else len(coverage)
+    }
+
+
+def print_report(report, cached, elapsed):
+    source = "cached" if cached else f"{report['nodes_audited']} AX nodes"
+    print(f"\n[+] Audit complete ({source}, {elapsed * 1000:.0f} ms)")
+
+    print(f"    Unnamed buttons: {len(report['unnamed_buttons'])}")
+    for entry in report["unnamed_buttons"]:
+        print(f"      - {entry['element']}")
+
+    print(f"    Focusable nodes without role: {len(report['focusable_without_role'])}")
+    for entry in report["focusable_without_role"]:
+        print(f"      - {entry['element']} (role: {entry['role'] or 'none'})")
+
+    if report["unmatched_rules"] is None:
+        print("    [!] window.tsA11yRules not found. Is the accessibility script injected?")
+    else:
+        print(f"    Rules that matched nothing: {len(report['unmatched_rules'])}/{report['rules_total']}")
+        for rule in report["unmatched_rules"]:
+            error = f" [error: {rule['error']}]" if "error" in rule else ""
+            print(f"      - {rule['name']} ({rule['selector']}){error}")
+
+
+def report_findings(report):
+    return (report["unnamed_buttons"], report["focusable_without_role"], report["unmatched_rules"])
+
+
+def save_report(report):
+    os.makedirs(AUDIT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = os.path.join(AUDIT_DIR, f"audit_{timestamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[+] Report saved to: {path}")
+
+
+def audit(session, selectors, cache, rules_fp, use_cache=True, watch=False, last_report=None):
+    """
+    Audits the current screen and returns the report (None on error).
+    In watch mode the report file is only written if the findings differ
+    from `last_report`.
+    """
+    start = time.time()
+    # Fingerprint and rule coverage come from the same evaluation, reused on a cache miss
+    snapshot = take_snapshot(session, with_coverage=True)
+    if not snapshot:
+        return None
+    dom_fp = snapshot["fingerprint"]
+
+    key = cache_key(dom_fp, rules_fp, selectors)
+    if use_cache and key in cache:
+        report = cache.pop(key)
+        cache[key] = report  # Mark as most recently used
+        print_report(report, True, time.time() - start)
+        return report
+
+    report = run_audit(session, selectors, snapshot["coverage"])
+    if report is None:
+        print("[!] Audit aborted, nothing was saved.")
+        return None
+    report["fingerprint"] = dom_fp
+    print_report(report, False, time.time() - start)
+
+    if not watch or last_report is None or report_findings(report) != report_findings(last_report):
+        save_report(report)
+
+    after = take_snapshot(session, with_coverage=False)
+    if not after or after["fingerprint"] != dom_fp:
+        print("[!] The screen changed during the audit, result not cached.")
+    elif report["nodes_audited"] > 0 and report["unmatched_rules"] is not None:
+        # Reports without coverage only mean "script not injected yet": don't keep them
+        cache.pop(key, None)
+        cache[key] = report
+        save_cache(cache)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audits the TeamSpeak accessibility tree via the Chrome DevTools Protocol.")
+    parser.add_argument("--subtree", action="append", default=[], metavar="SELECTOR",
+                        help="Only audit the accessibility subtree of elements matching this CSS selector (repeatable)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Re-audit automatically after every route change")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached results and always query the accessibility tree")
+    args = parser.parse_args()
+
+    print("--- TeamSpeak Accessibility Auditor ---")
+
+    # Ensure TS is running
+    os_info = get_os_info()
+    if not launch_teamspeak(os_info):
+        print("[!] Warning: Could not launch TeamSpeak. Attempting to connect anyway...")
+
+    time.sleep(2)
+
+    ws_url = get_websocket_debugger_url()
+    if not ws_url:
+        print("[!] Could not connect to debugger. Ensure TeamSpeak is running with remote debugging.")
+        return
+
+    rules_fp = get_rules_fingerprint()
+    # --no-cache only skips the lookup: fresh results are still merged into the saved cache
+    cache = load_cache(rules_fp)
+
+    try:
+        ws = websocket.create_connection(ws_url, suppress_origin=True)
+        session = CdpSession(ws, keep_events=["Runtime.bindingCalled"] if args.watch else [])
+        if args.subtree:
+            # DOM node ids and AX node ids used by the subtree walk are only stable while enabled
+            session.batch([("DOM.enable", None), ("Accessibility.enable", None)])
+        print("\n[*] Connected!")
+
+        if args.watch:
+            # bindingCalled events are only delivered while the Runtime domain is enabled
+            session.batch([("Runtime.enable", None), ("Runtime.addBinding", {"name": AUDIT_BINDING})])
+            print("[*] Watching route changes. Press Ctrl+C to stop.")
+            last_report = audit(session, args.subtree, cache, rules_fp, not args.no_cache, watch=True)
+            while True:
+                event = session.next_event()
+                if event["params"].get("name") == AUDIT_BINDING:
+                    print(f"\n[*] Route changed: {event['params'].get('payload')}")
+                    report = audit(session, args.subtree, cache, rules_fp, not args.no_cache,
+                                   watch=True, last_report=last_report)
+                    last_report = report or last_report
+        else:
+            print("[*] Navigate to the screen you want to audit in TeamSpeak.")
+            while True:
+                user_input = input("\n[Press Enter to Audit / 'q' to Quit] > ")
+                if user_input.lower() == 'q':
+                    break
+                audit(session, args.subtree, cache, rules_fp, not args.no_cache)
+
+    except KeyboardInterrupt:
+        print("\n[*] Exiting...")
+    except Exception as e:
+        print(f"[!] Connection Error: {e}")
+    finally:
+        if 'ws' in locals() and ws.connected:
+            ws.close()
+
+if __name__ == "__main__":
+    main()
@@ -76,6 +76,11 @@
             setTimeout(() => {
                 applyRules(document);
 
+                // Notify audit_a11y.py (--watch) once the new route has been processed
+                if (typeof window.__tsA11yAuditNotify === 'function') {
+                    window.__tsA11yAuditNotify(to.path);
+                }
+
                 // Automatic Focus Management
                 // If focus is already on a meaningful element (likely set by Magnetic Focus), don't override it.
                 if (document.activeElement && 